@@ -1,20 +1,23 @@
 import streamlit as st
 import asyncio
+import contextlib
 import os
-import io
-import wave
 import glob
 import traceback
 from pathlib import Path
 from google import genai
 from dotenv import load_dotenv
+from audio_executor import get_audio_executor, iter_pcm_chunks
+from audio_decoder import SEND_MIME_TYPE, SEND_SAMPLE_RATE, UPLOAD_AUDIO_TYPES, InvalidInputError, iter_decoded_pcm
+from model_router import BACKENDS, DEFAULT_POLICY, POLICIES, estimate_answer_tokens, estimate_cost, get_model_router
+from video_pipeline import FrameCapture, TOKENS_PER_FRAME, interleave_turn, prepare_video_turn
+from streamlit_webrtc import webrtc_streamer
 import time
 
 load_dotenv()
 
 # --- CONFIGURATION ---
 API_KEY = os.getenv("GOOGLE_API_KEY")
-MODEL = "gemini-2.5-flash-native-audio-preview-12-2025"
 KNOWLEDGE_BASE_DIR = "knowledge_bases"
 INSTRUCTION_FILE = "instruction.md"
 
@@ -23,7 +26,7 @@ RECEIVE_SAMPLE_RATE = 24000
 CHANNELS = 1
 CHUNK_SIZE_SEND = 4096 
 
-# Pricing
+# Pricing (history entries without a routed backend; see model_router.BACKENDS)
 COST_PER_1M_INPUT_TEXT = 0.10
 COST_PER_1M_OUTPUT_TEXT = 0.40
 
@@ -32,6 +35,8 @@ if "chat_history" not in st.session_state:
     st.session_state.chat_history = []
 if "audio_input_key" not in st.session_state:
     st.session_state.audio_input_key = 0  # Counter to reset the widget
+if "frame_capture" not in st.session_state:
+    st.session_state.frame_capture = FrameCapture()  # Fed by the WebRTC video callback thread
 
 def load_instruction_base():
     # If file doesn't exist, create it with the template
@@ -87,91 +92,154 @@ def load_knowledge_bases():
     if not kbs: kbs["default"] = "No specific knowledge base loaded."
     return kbs
 
-def pcm_to_wav(pcm_data, sample_rate=RECEIVE_SAMPLE_RATE):
-    wav_buffer = io.BytesIO()
-    with wave.open(wav_buffer, "wb") as wav_file:
-        wav_file.setnchannels(CHANNELS)
-        wav_file.setsampwidth(2) 
-        wav_file.setframerate(sample_rate)
-        wav_file.writeframes(pcm_data)
-    return wav_buffer.getvalue()
-
-def calculate_cost(input_tok, output_tok):
+def calculate_cost(input_tok, output_tok, backend_name=None):
+    if backend_name:
+        return estimate_cost(backend_name, input_tok, output_tok)
     return ((input_tok / 1_000_000) * COST_PER_1M_INPUT_TEXT) + \
            ((output_tok / 1_000_000) * COST_PER_1M_OUTPUT_TEXT)
 
 # --- CORE INTERACTION LOGIC ---
-async def generate_response(input_data, input_type, system_instruction):
-    client = genai.Client(api_key=API_KEY, http_options={"api_version": "v1beta"})
-    
+async def prepare_turn(input_data, input_type, audio_executor):
+    """
+    Do the input-side work (photo/frame encoding, WAV decode) before any backend
+    is contacted, so a bad input fails once instead of on every fallback.
+    Compressed audio is still decoded while it streams, see live_turn.
+    """
+    turn = {"text": None, "audio": None, "frames": [], "pcm": None, "sample_rate": None,
+            "input_tokens": 0, "video": None}
+
+    if input_type == "text":
+        turn["text"] = input_data
+        turn["input_tokens"] = len(input_data) // 4
+
+    elif input_type == "audio":
+        # A recording in any container (WAV, WebM/Opus, Ogg, ...)
+        turn["audio"] = input_data
+
+    elif input_type == "video":
+        # input_data is a dict: frames, capture_stats, photo, and a text or audio question
+        turn["frames"], turn["video"] = await prepare_video_turn(
+            audio_executor, input_data["frames"], input_data["capture_stats"], input_data.get("photo")
+        )
+        turn["input_tokens"] = turn["video"]["frames_sent"] * TOKENS_PER_FRAME
+        if input_data.get("audio"):
+            turn["sample_rate"], duration, turn["pcm"] = await audio_executor.wav_to_pcm(input_data["audio"])
+            turn["input_tokens"] += int(duration * 25)
+        if input_data.get("text"):
+            # A typed question goes after the spoken one and ends the turn
+            turn["text"] = input_data["text"]
+            turn["input_tokens"] += len(input_data["text"]) // 4
+
+    return turn
+
+async def live_turn(client, backend, turn, system_instruction, audio_executor):
+    """Run one prepared turn on one backend; raises on failure so the caller can fall back."""
     config = {
-        "response_modalities": ["AUDIO"], 
-        "system_instruction": {"parts": [{"text": system_instruction}]},
-        "speech_config": {"voice_config": {"prebuilt_voice_config": {"voice_name": "Puck"}}}
+        "response_modalities": [backend.response_modality], 
+        "system_instruction": {"parts": [{"text": system_instruction}]}
     }
+    if backend.response_modality == "AUDIO":
+        config["speech_config"] = {"voice_config": {"prebuilt_voice_config": {"voice_name": "Puck"}}}
 
     cumulative_text = ""
     cumulative_pcm = bytearray()
     first_token_time = None
-    api_start_time = time.time() # Start measuring API time
-    input_tokens = 0
+    turn_end_time = None # Start measuring API time at the end of the turn
+    input_tokens = turn["input_tokens"]
     
-    try:
-        async with client.aio.live.connect(model=MODEL, config=config) as session:
-            # 1. Send Logic
-            if input_type == "text":
-                input_tokens = len(input_data) // 4
-                await session.send(input=input_data, end_of_turn=True)
-                
-            elif input_type == "audio":
-                # Extract PCM from the uploaded WAV file
-                with wave.open(io.BytesIO(input_data), 'rb') as w:
-                    sample_rate = w.getframerate()
-                    raw_pcm_data = w.readframes(w.getnframes())
-                    duration = w.getnframes() / w.getframerate()
-                    input_tokens = int(duration * 25)
-
-                mime_type = f"audio/pcm;rate={sample_rate}"
-                
-                with io.BytesIO(raw_pcm_data) as pcm_stream:
-                    while True:
-                        chunk = pcm_stream.read(CHUNK_SIZE_SEND)
-                        if not chunk:
-                            break
-                        is_last = (pcm_stream.tell() == len(raw_pcm_data))
-                        await session.send(input={"data": chunk, "mime_type": mime_type}, end_of_turn=is_last)
-
-            # 2. Receive Logic
-            async for response in session.receive():
-                if response.server_content and response.server_content.model_turn:
-                    for part in response.server_content.model_turn.parts:
-                        if first_token_time is None and (part.text or part.inline_data):
-                            first_token_time = time.time()
-                        
-                        if part.text:
-                            cumulative_text += part.text
-                        if part.inline_data:
-                            cumulative_pcm.extend(part.inline_data.data)
+    async with client.aio.live.connect(model=backend.model, config=config) as session:
+        # 1. Send Logic
+        if turn["audio"] is not None:
+            # Decoded and resampled chunk by chunk while it streams
+            pcm_bytes_sent = 0
+            decoded_chunks = iter_decoded_pcm(turn["audio"], CHUNK_SIZE_SEND, SEND_SAMPLE_RATE)
+            async with contextlib.aclosing(audio_executor.iterate(decoded_chunks)) as chunks:
+                async for chunk, is_last in chunks:
+                    if is_last:
+                        turn_end_time = time.time()
+                    await session.send(input={"data": chunk, "mime_type": SEND_MIME_TYPE}, end_of_turn=is_last)
+                    pcm_bytes_sent += len(chunk)
+            if turn_end_time is None:
+                raise InvalidInputError("The recording contains no audio")
+            input_tokens += int(pcm_bytes_sent / (SEND_SAMPLE_RATE * 2) * 25)
+
+        else:
+            # Text, or video frames followed by the spoken and/or typed question
+            audio_chunks = iter_pcm_chunks(turn["pcm"], CHUNK_SIZE_SEND) if turn["pcm"] else ()
+            for payload, is_last in interleave_turn(turn["frames"], audio_chunks, turn["sample_rate"], turn["text"]):
+                if is_last:
+                    turn_end_time = time.time()
+                await session.send(input=payload, end_of_turn=is_last)
+
+        # 2. Receive Logic
+        async for response in session.receive():
+            if response.server_content and response.server_content.model_turn:
+                for part in response.server_content.model_turn.parts:
+                    if first_token_time is None and (part.text or part.inline_data):
+                        first_token_time = time.time()
                     
-                    if response.server_content.turn_complete:
-                        break
-                        
-    except Exception as e:
-        tb_str = traceback.format_exc()
-        return None, None, {"error": f"{str(e)}\n\n{tb_str}"}
+                    if part.text:
+                        cumulative_text += part.text
+                    if part.inline_data:
+                        cumulative_pcm.extend(part.inline_data.data)
+                
+                if response.server_content.turn_complete:
+                    break
 
     # 3. Process Metrics
     # Time to First Token (TTFT) - API Latency
-    ttft_latency = (first_token_time - api_start_time) if first_token_time else 0.0
+    # Measured from the end_of_turn send so upload time of long inputs is not counted
+    ttft_latency = (first_token_time - turn_end_time) if first_token_time and turn_end_time else 0.0
     output_tokens = len(cumulative_text) // 4 if cumulative_text else 0
+    output_tokens += int(len(cumulative_pcm) / (RECEIVE_SAMPLE_RATE * 2) * 25)  # audio reply, same rate as input audio
     
     metrics = {
+        "backend": backend.name,
         "ttft_latency": ttft_latency,
         "input_tokens": input_tokens,
         "output_tokens": output_tokens
     }
-    
-    wav_data = pcm_to_wav(bytes(cumulative_pcm)) if cumulative_pcm else None
+    if turn["video"]:
+        metrics["video"] = turn["video"]
+
+    return cumulative_text, cumulative_pcm, metrics
+
+async def generate_response(input_data, input_type, system_instruction, routing_policy=None, audio_reply=True):
+    client = genai.Client(api_key=API_KEY, http_options={"api_version": "v1beta"})
+    audio_executor = get_audio_executor()  # backend from AUDIO_EXECUTOR_BACKEND
+    router = get_model_router()
+
+    # Input errors are the caller's, not a backend's: report them without routing
+    try:
+        turn = await prepare_turn(input_data, input_type, audio_executor)
+    except Exception as e:
+        return None, None, {"error": f"Invalid input: {str(e)}\n\n{traceback.format_exc()}"}
+
+    # Pick a backend for this turn; fall back down the list if it fails
+    answer_tokens = estimate_answer_tokens(input_type, turn["text"])
+    candidates = router.route(input_type, answer_tokens, audio_output=audio_reply, policy=routing_policy)
+
+    errors = []
+    for backend_name in candidates:
+        try:
+            cumulative_text, cumulative_pcm, metrics = await live_turn(
+                client, BACKENDS[backend_name], turn, system_instruction, audio_executor
+            )
+        except InvalidInputError as e:
+            # The recording could not be decoded; another backend would fail the same way
+            return None, None, {"error": f"Invalid input: {str(e)}\n\n{traceback.format_exc()}"}
+        except Exception as e:
+            router.record(backend_name, error=True)
+            tb_str = traceback.format_exc()
+            errors.append(f"[{backend_name}] {str(e)}\n\n{tb_str}")
+            continue
+        router.record(backend_name, ttft=metrics["ttft_latency"] or None)
+        break
+    else:
+        return None, None, {"error": "\n\n".join(errors)}
+
+    metrics["failed_backends"] = candidates[:len(errors)]
+    wav_data = await audio_executor.pcm_to_wav(cumulative_pcm, RECEIVE_SAMPLE_RATE) if cumulative_pcm else None
     return cumulative_text, wav_data, metrics
 
 # --- UI LAYOUT ---
@@ -187,6 +255,11 @@ with st.sidebar:
     # Load raw instruction template
     raw_instruction = load_instruction_base()
     
+    st.header("Routing")
+    routing_policy = st.selectbox("Routing Policy", POLICIES, index=POLICIES.index(DEFAULT_POLICY),
+                                  help="native: always native audio. latency/cost/balanced: pick per turn from rolling TTFT/error stats")
+    audio_reply = st.checkbox("🔈 Audio replies", value=True, help="Untick to allow cheaper text-only replies")
+    
     if st.button("🗑️ Clear Chat"):
         st.session_state.chat_history = []
         st.session_state.audio_input_key = 0 # Reset key
@@ -202,7 +275,7 @@ full_system_instruction = f"{formatted_instruction}\n\nCONTEXT:\n{kb_text}"
 
 # 2. Chat History (Natural Flow)
 if not st.session_state.chat_history:
-    st.info("Start the conversation below using Text or Audio.")
+    st.info("Start the conversation below using Text, Audio or Video.")
 
 for msg in st.session_state.chat_history:
     with st.chat_message(msg["role"]):
@@ -210,15 +283,23 @@ for msg in st.session_state.chat_history:
             if msg["type"] == "text":
                 st.write(msg["content"])
             elif msg["type"] == "audio":
-                st.audio(msg["content"], format="audio/wav")
+                st.audio(msg["content"], format=msg.get("format", "audio/wav"))
+            elif msg["type"] == "video":
+                if msg.get("content"):
+                    st.write(msg["content"])
+                if msg.get("audio"):
+                    st.audio(msg["audio"], format="audio/wav")
+                st.caption(f"📷 {msg['frames']} frame(s) captured")
         
         elif msg["role"] == "assistant":
             if msg.get("audio"):
                 st.audio(msg["audio"], format="audio/wav")
+            if msg.get("text"):
+                st.write(msg["text"])
             
             if msg.get("metrics"):
                 m = msg["metrics"]
-                cost = calculate_cost(m["input_tokens"], m["output_tokens"])
+                cost = calculate_cost(m["input_tokens"], m["output_tokens"], m.get("backend"))
                 
                 # UPDATE: Use weighted ratios to give 'Cost' more space
                 # [TTFT, Total Latency, In Tok, Out Tok, Cost]
@@ -231,9 +312,20 @@ for msg in st.session_state.chat_history:
                 cols[3].metric("Out Tok", m["output_tokens"])
                 cols[4].metric("Cost", f"${cost:.5f}")
 
+                if m.get("backend"):
+                    failed = f" (after {', '.join(m['failed_backends'])} failed)" if m.get("failed_backends") else ""
+                    st.caption(f"🧭 Backend: {m['backend']}{failed}")
+                if m.get("video"):
+                    v = m["video"]
+                    st.caption(
+                        f"📷 Video: {v['frames_sent']} frames sent ({v['bytes_sent'] / 1024:.1f} KB), "
+                        f"skipped {v['frames_skipped_duplicate']} duplicate / {v['frames_skipped_rate']} over fps / "
+                        f"{v['frames_skipped_bitrate']} over bitrate"
+                    )
+
 # 3. Input Controls
 st.divider()
-tab_text, tab_audio = st.tabs(["⌨️ Text Input", "🎙️ Audio Input"])
+tab_text, tab_audio, tab_video = st.tabs(["⌨️ Text Input", "🎙️ Audio Input", "📷 Video Input"])
 
 # --- TEXT TAB ---
 with tab_text:
@@ -246,7 +338,7 @@ with tab_text:
         
         with st.spinner("Gemini is thinking..."):
             text_resp, audio_resp, metrics = asyncio.run(
-                generate_response(text_input, "text", full_system_instruction)
+                generate_response(text_input, "text", full_system_instruction, routing_policy, audio_reply)
             )
             
             # Calculate Total Output Latency
@@ -272,17 +364,26 @@ with tab_audio:
         key=f"audio_in_{st.session_state.audio_input_key}"
     )
     
-    if audio_input:
-        audio_bytes = audio_input.read()
+    # Compressed recordings (e.g. WebM/Opus from a browser or gateway) are sent as-is and decoded while streaming
+    voice_note = st.file_uploader(
+        "...or upload a voice note",
+        type=UPLOAD_AUDIO_TYPES,
+        key=f"voice_note_{st.session_state.audio_input_key}"
+    )
+    
+    recording = audio_input or voice_note
+    if recording:
+        audio_bytes = recording.read()
+        audio_format = recording.type or "audio/wav"
         
-        st.session_state.chat_history.append({"role": "user", "type": "audio", "content": audio_bytes})
+        st.session_state.chat_history.append({"role": "user", "type": "audio", "content": audio_bytes, "format": audio_format})
         
         # Start Timer for Total Output Latency
         ui_start_time = time.time()
 
-        with st.spinner("Streaming PCM data to Gemini..."):
+        with st.spinner("Streaming audio to Gemini..."):
             text_resp, audio_resp, metrics = asyncio.run(
-                generate_response(audio_bytes, "audio", full_system_instruction)
+                generate_response(audio_bytes, "audio", full_system_instruction, routing_policy, audio_reply)
             )
             
             # Calculate Total Output Latency
@@ -301,4 +402,72 @@ with tab_audio:
                 
                 # Increment key to reset the audio widget on rerun
                 st.session_state.audio_input_key += 1
-                st.rerun()
\ No newline at end of file
+                st.rerun()
+
+# --- VIDEO TAB ---
+with tab_video:
+    st.write("📷 Start the camera or upload a photo, then ask about what the bot can see")
+
+    # Frames are sampled (fps cap + near-duplicate skip) and downscaled on the WebRTC thread
+    webrtc_streamer(
+        key="video_in",
+        video_frame_callback=st.session_state.frame_capture,
+        media_stream_constraints={"video": True, "audio": False},
+    )
+    photo = st.file_uploader("...or upload a photo", type=["jpg", "jpeg", "png"], key=f"photo_in_{st.session_state.audio_input_key}")
+    video_question = st.text_input("Your question", key=f"video_question_{st.session_state.audio_input_key}")
+    video_audio = st.audio_input(
+        "Or ask by voice",
+        key=f"video_audio_{st.session_state.audio_input_key}"
+    )
+
+    if st.button("🚀 Send Video", type="primary"):
+        frames, capture_stats = st.session_state.frame_capture.drain()
+        photo_bytes = photo.getvalue() if photo else None
+        video_audio_bytes = video_audio.read() if video_audio else None
+
+        if not frames and not photo_bytes:
+            st.warning("No frames captured yet. Start the camera or upload a photo first.")
+        elif not video_question and not video_audio_bytes:
+            st.warning("Type or record a question to go with the frames.")
+        else:
+            st.session_state.chat_history.append({
+                "role": "user",
+                "type": "video",
+                "content": video_question,
+                "audio": video_audio_bytes,
+                "frames": len(frames) + (1 if photo_bytes else 0)
+            })
+            input_data = {
+                "frames": frames,
+                "capture_stats": capture_stats,
+                "photo": photo_bytes,
+                "text": video_question,
+                "audio": video_audio_bytes
+            }
+
+            # Start Timer for Total Output Latency
+            ui_start_time = time.time()
+
+            with st.spinner("Streaming frames to Gemini..."):
+                text_resp, audio_resp, metrics = asyncio.run(
+                    generate_response(input_data, "video", full_system_instruction, routing_policy, audio_reply)
+                )
+
+                # Calculate Total Output Latency
+                ui_end_time = time.time()
+                metrics["total_latency"] = ui_end_time - ui_start_time
+
+                if metrics.get("error"):
+                    st.error(f"Error: {metrics['error']}")
+                else:
+                    st.session_state.chat_history.append({
+                        "role": "assistant",
+                        "text": text_resp,
+                        "audio": audio_resp,
+                        "metrics": metrics
+                    })
+
+                    # Increment key to reset the video tab widgets on rerun
+                    st.session_state.audio_input_key += 1
+                    st.rerun()
@@ -0,0 +1,65 @@
+#audio_decoder.py
+import io
+
+import av
+
+from audio_executor import CHANNELS, SAMPLE_WIDTH
+
+# Live API input audio: 16-bit mono PCM at 16kHz
+SEND_SAMPLE_RATE = 16000
+SEND_MIME_TYPE = f"audio/pcm;rate={SEND_SAMPLE_RATE}"
+
+# Containers browsers and gateway clients record to; anything FFmpeg reads also works
+UPLOAD_AUDIO_TYPES = ["webm", "ogg", "opus", "m4a", "mp3", "wav"]
+
+class InvalidInputError(ValueError):
+    """The recording itself cannot be decoded; retrying on another backend will not help."""
+
+def iter_decoded_pcm(source, chunk_size, sample_rate=SEND_SAMPLE_RATE):
+    """
+    Decode a recording (WAV, WebM/Opus, Ogg, ...) frame by frame and yield
+    (chunk, is_last) pairs of 16-bit mono PCM at sample_rate.
+
+    source is bytes or a readable file object. Only one decoded frame plus
+    one chunk is held at a time, so memory does not grow with the length of
+    the recording. Decode failures are raised as InvalidInputError.
+    """
+    try:
+        yield from _decode_pcm_chunks(source, chunk_size, sample_rate)
+    except av.error.FFmpegError as e:
+        raise InvalidInputError(f"Could not decode the recording: {e}") from e
+
+def _decode_pcm_chunks(source, chunk_size, sample_rate):
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        source = io.BytesIO(source)
+
+    layout = "mono" if CHANNELS == 1 else "stereo"
+    resampler = av.AudioResampler(format="s16", layout=layout, rate=sample_rate)
+    frame_bytes = SAMPLE_WIDTH * CHANNELS
+    pending = bytearray()
+    ready = None  # held back one chunk so the last one can be flagged
+
+    with av.open(source) as container:
+        if not container.streams.audio:
+            raise InvalidInputError("The recording has no audio track")
+        stream = container.streams.audio[0]
+        frames = container.decode(stream)
+        while True:
+            frame = next(frames, None)
+            # A None frame flushes the resampler once the input is exhausted
+            for out in resampler.resample(frame):
+                pending.extend(memoryview(out.planes[0])[:out.samples * frame_bytes])
+                while len(pending) >= chunk_size:
+                    if ready is not None:
+                        yield ready, False
+                    ready = bytes(pending[:chunk_size])
+                    del pending[:chunk_size]
+            if frame is None:
+                break
+
+    if pending:
+        if ready is not None:
+            yield ready, False
+        ready = bytes(pending)
+    if ready is not None:
+        yield ready, True
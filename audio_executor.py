@@ -0,0 +1,198 @@
+#audio_executor.py
+import asyncio
+import io
+import multiprocessing
+import os
+import sys
+import wave
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass
+from multiprocessing import shared_memory
+
+# Audio parameters shared with the apps
+CHANNELS = 1
+SAMPLE_WIDTH = 2  # 16-bit audio
+
+BACKENDS = ("inline", "thread", "process")
+DEFAULT_BACKEND = os.getenv("AUDIO_EXECUTOR_BACKEND", "thread")
+SHARED_RESULT_MIN_BYTES = 64 * 1024  # smaller process-backend results are cheaper to pickle
+
+# --- WORKER FUNCTIONS ---
+# Module-level so the process backend can pickle them by reference.
+def wav_to_pcm(wav_data):
+    """Parse WAV bytes into (sample_rate, duration_seconds, raw_pcm)."""
+    with wave.open(io.BytesIO(wav_data), "rb") as w:
+        sample_rate = w.getframerate()
+        n_frames = w.getnframes()
+        raw_pcm = w.readframes(n_frames)
+    return sample_rate, n_frames / sample_rate, raw_pcm
+
+def pcm_to_wav(pcm_data, sample_rate, channels=CHANNELS):
+    wav_buffer = io.BytesIO()
+    with wave.open(wav_buffer, "wb") as wav_file:
+        wav_file.setnchannels(channels)
+        wav_file.setsampwidth(SAMPLE_WIDTH)
+        wav_file.setframerate(sample_rate)
+        wav_file.writeframes(pcm_data)
+    return wav_buffer.getvalue()
+
+def iter_pcm_chunks(pcm_data, chunk_size):
+    """Yield (chunk, is_last) slices of pcm_data without copying the whole buffer."""
+    view = memoryview(pcm_data)
+    total = len(view)
+    for offset in range(0, total, chunk_size):
+        end = min(offset + chunk_size, total)
+        yield view[offset:end].tobytes(), end == total
+
+def _attach_shared(name):
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+    return shared_memory.SharedMemory(name=name)
+
+@dataclass(frozen=True)
+class _SharedResult:
+    name: str
+    size: int
+
+def _share_result(result):
+    """Worker side: move large byte results (also inside tuples) into shared memory."""
+    if isinstance(result, tuple):
+        return tuple(_share_result(item) for item in result)
+    if isinstance(result, (bytes, bytearray)) and len(result) >= SHARED_RESULT_MIN_BYTES:
+        shm = shared_memory.SharedMemory(create=True, size=len(result))
+        try:
+            shm.buf[:len(result)] = result
+        except BaseException:
+            shm.close()
+            shm.unlink()
+            raise
+        shm.close()
+        return _SharedResult(shm.name, len(result))
+    return result
+
+def _collect_result(result):
+    """Caller side: copy shared results out once and free their segments."""
+    if isinstance(result, tuple):
+        return tuple(_collect_result(item) for item in result)
+    if isinstance(result, _SharedResult):
+        shm = shared_memory.SharedMemory(name=result.name)
+        try:
+            return bytes(shm.buf[:result.size])
+        finally:
+            shm.close()
+            shm.unlink()
+    return result
+
+def _call_on_shared(fn, name, size, *args):
+    shm = _attach_shared(name)
+    view = shm.buf[:size]
+    try:
+        return _share_result(fn(view, *args))
+    finally:
+        view.release()
+        shm.close()
+
+# --- EXECUTOR ---
+class AudioExecutor:
+    """
+    Runs CPU-bound audio work (WAV decode/encode, and later resampling, VAD
+    and compression) off the event loop so one session's audio processing
+    does not stall the websocket I/O of every other session.
+
+    Backends:
+        inline  - run on the calling thread (baseline, no offload)
+        thread  - ThreadPoolExecutor; buffers are passed by reference
+        process - ProcessPoolExecutor; input buffers and large results are
+                  handed over through shared memory instead of being pickled
+                  down the pipe
+    """
+
+    def __init__(self, backend=DEFAULT_BACKEND, max_workers=None):
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown audio executor backend '{backend}', expected one of {BACKENDS}")
+        self.backend = backend
+        if backend == "thread":
+            self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="audio")
+        elif backend == "process":
+            # spawn: forking the multi-threaded Streamlit server is not safe
+            self._pool = ProcessPoolExecutor(
+                max_workers=max_workers, mp_context=multiprocessing.get_context("spawn")
+            )
+        else:
+            self._pool = None
+
+    async def run(self, fn, *args):
+        """Run fn(*args) on the configured backend and await its result."""
+        if self._pool is None:
+            return fn(*args)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._pool, fn, *args)
+
+    async def run_on_buffer(self, fn, data, *args):
+        """
+        Run fn(data, *args) where data is a bytes-like buffer.
+        On the process backend the buffer is copied once into a shared memory
+        segment and the worker receives a memoryview over it; bytes results of
+        SHARED_RESULT_MIN_BYTES or more come back the same way.
+        """
+        if self.backend != "process":
+            return await self.run(fn, data, *args)
+
+        size = len(data)
+        shm = shared_memory.SharedMemory(create=True, size=max(size, 1))
+        try:
+            shm.buf[:size] = data
+            result = await self.run(_call_on_shared, fn, shm.name, size, *args)
+        finally:
+            shm.close()
+            shm.unlink()
+        return _collect_result(result)
+
+    async def iterate(self, iterator):
+        """
+        Async-iterate a blocking iterator (e.g. a streaming decoder), pulling
+        each item off the event loop. Generators cannot be sent to another
+        process, so the process backend pulls on the loop's default thread pool.
+        The iterator is closed when iteration stops early, e.g. a failed send.
+        """
+        sentinel = object()
+        loop = asyncio.get_running_loop()
+        pool = self._pool if self.backend == "thread" else None
+        pending = None
+        try:
+            while True:
+                if self._pool is None:
+                    item = next(iterator, sentinel)
+                else:
+                    # Shielded so a cancelled consumer does not mark the pull
+                    # done while next() is still running on the worker
+                    pending = loop.run_in_executor(pool, next, iterator, sentinel)
+                    item = await asyncio.shield(pending)
+                if item is sentinel:
+                    return
+                yield item
+        finally:
+            if pending is not None and not pending.done():
+                # Let the in-flight next() finish; closing a running generator raises
+                await asyncio.gather(pending, return_exceptions=True)
+            close = getattr(iterator, "close", None)
+            if close is not None:
+                close()
+
+    async def wav_to_pcm(self, wav_data):
+        return await self.run_on_buffer(wav_to_pcm, wav_data)
+
+    async def pcm_to_wav(self, pcm_data, sample_rate, channels=CHANNELS):
+        return await self.run_on_buffer(pcm_to_wav, pcm_data, sample_rate, channels)
+
+    def shutdown(self, wait=True):
+        if self._pool is not None:
+            self._pool.shutdown(wait=wait)
+
+_executors = {}
+
+def get_audio_executor(backend=DEFAULT_BACKEND):
+    """Return the process-wide executor for a backend, creating it on first use."""
+    if backend not in _executors:
+        _executors[backend] = AudioExecutor(backend)
+    return _executors[backend]
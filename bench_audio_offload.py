@@ -0,0 +1,139 @@
+#bench_audio_offload.py
+"""
+Event-loop lag and session throughput for N concurrent fake Live sessions,
+with audio work run inline on the loop vs. offloaded through AudioExecutor.
+
+Each fake call mirrors generate_response: decode the uploaded WAV, stream
+4 KB PCM chunks to a fake websocket, collect a fake audio reply and encode
+it back to WAV. --dsp-passes adds a CPU-bound pass over the PCM to stand in
+for the resampling/VAD/encoding work that will land on the same path.
+
+    python bench_audio_offload.py --sessions 1 4 16 --backends inline thread process
+"""
+import argparse
+import array
+import asyncio
+import math
+import statistics
+import time
+
+from audio_executor import AudioExecutor, BACKENDS, iter_pcm_chunks, pcm_to_wav
+
+SEND_SAMPLE_RATE = 16000
+RECEIVE_SAMPLE_RATE = 24000
+CHUNK_SIZE_SEND = 4096
+LAG_INTERVAL = 0.005
+
+def make_wav(seconds, sample_rate=SEND_SAMPLE_RATE, freq=440.0):
+    n = int(seconds * sample_rate)
+    samples = array.array("h", (int(8000 * math.sin(2 * math.pi * freq * i / sample_rate)) for i in range(n)))
+    return pcm_to_wav(samples.tobytes(), sample_rate)
+
+def simulated_dsp(pcm_data, passes):
+    """Pure-Python pass over the samples, a stand-in for resample/VAD work."""
+    samples = array.array("h")
+    samples.frombytes(bytes(pcm_data))
+    peak = 0
+    for _ in range(passes):
+        for s in samples[::4]:
+            if abs(s) > peak:
+                peak = abs(s)
+    return peak
+
+class FakeSession:
+    """Websocket stand-in: sends cost a network round trip, replies stream back in chunks."""
+
+    def __init__(self, reply_pcm, rtt):
+        self.reply_pcm = reply_pcm
+        self.rtt = rtt
+
+    async def send(self, input, end_of_turn=False):
+        await asyncio.sleep(0)
+        if end_of_turn:
+            await asyncio.sleep(self.rtt)
+
+    async def receive(self):
+        for chunk, _ in iter_pcm_chunks(self.reply_pcm, CHUNK_SIZE_SEND):
+            await asyncio.sleep(0)
+            yield chunk
+
+async def fake_call(executor, wav_data, reply_pcm, args):
+    session = FakeSession(reply_pcm, args.rtt)
+    sample_rate, _, raw_pcm = await executor.wav_to_pcm(wav_data)
+    if args.dsp_passes:
+        await executor.run_on_buffer(simulated_dsp, raw_pcm, args.dsp_passes)
+
+    mime_type = f"audio/pcm;rate={sample_rate}"
+    for chunk, is_last in iter_pcm_chunks(raw_pcm, CHUNK_SIZE_SEND):
+        await session.send(input={"data": chunk, "mime_type": mime_type}, end_of_turn=is_last)
+
+    cumulative_pcm = bytearray()
+    async for chunk in session.receive():
+        cumulative_pcm.extend(chunk)
+    await executor.pcm_to_wav(cumulative_pcm, RECEIVE_SAMPLE_RATE)
+
+def percentile(samples, pct):
+    """pct-th percentile (1-99) of samples; a single sample is its own percentile."""
+    if len(samples) < 2:
+        return samples[0] if samples else 0.0
+    return statistics.quantiles(samples, n=100, method="inclusive")[pct - 1]
+
+async def monitor_lag(samples, stop):
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(LAG_INTERVAL)
+        samples.append(time.perf_counter() - start - LAG_INTERVAL)
+
+async def run_scenario(executor, n_sessions, wav_data, reply_pcm, args):
+    # Warm the pool so worker start-up is not billed to the first calls
+    await executor.run(abs, 0)
+
+    lag_samples = []
+    stop = asyncio.Event()
+    monitor = asyncio.create_task(monitor_lag(lag_samples, stop))
+
+    async def session_loop():
+        for _ in range(args.turns):
+            await fake_call(executor, wav_data, reply_pcm, args)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(session_loop() for _ in range(n_sessions)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await monitor
+
+    return {
+        "turns_per_s": n_sessions * args.turns / elapsed,
+        "lag_p50_ms": statistics.median(lag_samples) * 1000 if lag_samples else 0.0,
+        "lag_p99_ms": percentile(lag_samples, 99) * 1000,
+        "lag_max_ms": max(lag_samples, default=0.0) * 1000,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--backends", nargs="+", choices=BACKENDS, default=list(BACKENDS))
+    parser.add_argument("--turns", type=int, default=3, help="turns per session")
+    parser.add_argument("--seconds", type=float, default=10.0, help="length of each recorded question")
+    parser.add_argument("--reply-seconds", type=float, default=5.0, help="length of each audio reply")
+    parser.add_argument("--dsp-passes", type=int, default=2, help="extra CPU passes per turn (0 to disable)")
+    parser.add_argument("--rtt", type=float, default=0.05, help="fake network round trip in seconds")
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    wav_data = make_wav(args.seconds)
+    reply_pcm = bytes(int(args.reply_seconds * RECEIVE_SAMPLE_RATE) * 2)
+
+    print(f"{'backend':<8} {'sessions':>8} {'turns/s':>9} {'lag p50':>9} {'lag p99':>9} {'lag max':>9}")
+    for backend in args.backends:
+        executor = AudioExecutor(backend, max_workers=args.workers)
+        try:
+            for n in args.sessions:
+                r = asyncio.run(run_scenario(executor, n, wav_data, reply_pcm, args))
+                print(f"{backend:<8} {n:>8} {r['turns_per_s']:>9.2f} "
+                      f"{r['lag_p50_ms']:>7.1f}ms {r['lag_p99_ms']:>7.1f}ms {r['lag_max_ms']:>7.1f}ms")
+        finally:
+            executor.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -5,8 +5,10 @@ import contextlib
 import pyaudio
 from google import genai
 from google.genai import types
+from model_router import NATIVE_AUDIO_MODEL
 
 api_key = ''
+MODEL = NATIVE_AUDIO_MODEL  # same id as the apps' native_audio backend
 
 # Audio parameters from the Live API
 CHANNELS = 1
@@ -41,9 +43,6 @@ async def play_audio_realtime(prompt_text, save_to_file=False, output_filename="
     """
     try:
         client = genai.Client(api_key=api_key)
-        # MODEL = 'gemini-2.5-flash-native-audio-preview-09-2025'
-        # MODEL = 'gemini-live-2.5-flash-native-audio'
-        MODEL = "gemini-2.5-flash-native-audio-preview-12-2025"
         
         config = {
             "response_modalities": ["AUDIO"]
@@ -104,8 +103,6 @@ async def save_audio_to_file(prompt_text, output_filename="output.wav"):
     """
     try:
         client = genai.Client(api_key=api_key)
-        MODEL = 'gemini-2.5-flash-native-audio-preview-09-2025'
-        
         config = {
             "response_modalities": ["AUDIO"]
         }        
@@ -0,0 +1,204 @@
+#model_router.py
+import os
+import statistics
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+
+# Model ids (override per deployment without touching code)
+NATIVE_AUDIO_MODEL = os.getenv("NATIVE_AUDIO_MODEL", "gemini-2.5-flash-native-audio-preview-12-2025")
+HALF_CASCADE_MODEL = os.getenv("HALF_CASCADE_MODEL", "gemini-live-2.5-flash-preview")
+
+# Routing Config
+DEFAULT_POLICY = os.getenv("ROUTING_POLICY", "native")
+STATS_WINDOW = 20          # turns per backend kept for rolling TTFT/error stats
+MIN_SAMPLES = 3            # below this the backend's prior TTFT is used
+MAX_ERROR_RATE = 0.3       # above this a backend is degraded
+MAX_TTFT = 3.0             # seconds; rolling median above this is degraded
+DEGRADED_COOLDOWN = 30.0   # seconds before a degraded backend gets a probe turn
+LATENCY_SLACK = 0.25       # "balanced": cheapest backend within 25% of the fastest
+
+LONG_ANSWER_HINTS = (
+    "explain", "describe", "compare", "difference", "list", "all the", "walk me through",
+    "tell me about", "how does", "how do", "what are", "options", "details",
+)
+
+@dataclass(frozen=True)
+class Backend:
+    name: str
+    model: str
+    response_modality: str      # "AUDIO" or "TEXT"
+    input_types: tuple
+    cost_per_1m_input: float    # approximate list prices, keep in sync with the pricing page
+    cost_per_1m_output: float
+    prior_ttft: float           # seconds, used until enough turns have been observed
+    output_tokens_per_s: float
+
+BACKENDS = {
+    "native_audio": Backend(
+        name="native_audio", model=NATIVE_AUDIO_MODEL, response_modality="AUDIO",
+        input_types=("text", "audio", "video"),
+        cost_per_1m_input=3.00, cost_per_1m_output=12.00,
+        prior_ttft=0.9, output_tokens_per_s=60,
+    ),
+    "half_cascade": Backend(
+        name="half_cascade", model=HALF_CASCADE_MODEL, response_modality="AUDIO",
+        input_types=("text", "audio", "video"),
+        cost_per_1m_input=0.50, cost_per_1m_output=2.00,
+        prior_ttft=0.7, output_tokens_per_s=80,
+    ),
+    "live_text": Backend(
+        name="live_text", model=HALF_CASCADE_MODEL, response_modality="TEXT",
+        input_types=("text", "audio", "video"),
+        cost_per_1m_input=0.10, cost_per_1m_output=0.40,
+        prior_ttft=0.4, output_tokens_per_s=150,
+    ),
+}
+
+# Tried in order when the routed backend fails or is degraded
+FALLBACKS = {
+    "native_audio": ("half_cascade", "live_text"),
+    "half_cascade": ("native_audio", "live_text"),
+    "live_text": ("half_cascade", "native_audio"),
+}
+
+POLICIES = ("native", "latency", "cost", "balanced")
+
+def estimate_cost(backend_name, input_tokens, output_tokens, backends=BACKENDS):
+    backend = backends[backend_name]
+    return ((input_tokens / 1_000_000) * backend.cost_per_1m_input) + \
+           ((output_tokens / 1_000_000) * backend.cost_per_1m_output)
+
+def estimate_answer_tokens(input_type, text=None):
+    """Rough expected answer length: short factual questions vs. open-ended ones."""
+    if input_type != "text" or not text:
+        return 120
+    lowered = text.lower()
+    if any(hint in lowered for hint in LONG_ANSWER_HINTS):
+        return 300
+    return 60 + len(text) // 8
+
+class BackendStats:
+    def __init__(self, window=STATS_WINDOW):
+        self.ttfts = deque(maxlen=window)
+        self.errors = deque(maxlen=window)
+        self.last_seen = None
+
+    def error_rate(self):
+        return sum(self.errors) / len(self.errors) if self.errors else 0.0
+
+    def median_ttft(self):
+        return statistics.median(self.ttfts) if self.ttfts else None
+
+    def unhealthy(self):
+        if len(self.errors) < MIN_SAMPLES:
+            return False
+        return self.error_rate() > MAX_ERROR_RATE or (self.median_ttft() or 0.0) > MAX_TTFT
+
+    def reset(self):
+        self.ttfts.clear()
+        self.errors.clear()
+
+class ModelRouter:
+    """
+    Picks a backend per turn from the input type, the expected answer length
+    and rolling TTFT/error statistics, and returns it followed by its
+    fallbacks. Degraded backends are skipped until DEGRADED_COOLDOWN has
+    passed since their last turn, then get a probe turn; a healthy probe
+    resets their statistics.
+
+    Policies (native is the default, the others are opt-in):
+        native   - always native audio first (the previous hardcoded behaviour)
+        latency  - lowest expected TTFT + generation time
+        cost     - lowest expected cost
+        balanced - cheapest backend whose expected latency is within
+                   LATENCY_SLACK of the fastest
+    """
+
+    def __init__(self, backends=BACKENDS, fallbacks=FALLBACKS, policy=DEFAULT_POLICY, clock=time.monotonic):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown routing policy '{policy}', expected one of {POLICIES}")
+        self.backends = backends
+        self.fallbacks = fallbacks
+        self.policy = policy
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._stats = {name: BackendStats() for name in backends}
+
+    def expected_ttft(self, name):
+        stats = self._stats[name]
+        if len(stats.ttfts) >= MIN_SAMPLES:
+            return stats.median_ttft()
+        return self.backends[name].prior_ttft
+
+    def expected_latency(self, name, answer_tokens):
+        return self.expected_ttft(name) + answer_tokens / self.backends[name].output_tokens_per_s
+
+    def is_degraded(self, name):
+        stats = self._stats[name]
+        return stats.unhealthy() and self.clock() - stats.last_seen < DEGRADED_COOLDOWN
+
+    def route(self, input_type, answer_tokens, audio_output=True, policy=None):
+        """Return backend names to try in order: the routed backend, then its fallbacks."""
+        policy = policy or self.policy
+        with self._lock:
+            eligible = [
+                name for name, b in self.backends.items()
+                if input_type in b.input_types and (b.response_modality == "AUDIO" or not audio_output)
+            ]
+            if not eligible:
+                raise ValueError(f"No backend accepts input type '{input_type}'")
+            healthy = [name for name in eligible if not self.is_degraded(name)] or eligible
+
+            if policy == "native" and "native_audio" in healthy:
+                primary = "native_audio"
+            elif policy == "cost":
+                primary = min(healthy, key=lambda n: estimate_cost(n, 0, answer_tokens, self.backends))
+            elif policy == "balanced":
+                fastest = min(self.expected_latency(n, answer_tokens) for n in healthy)
+                within = [n for n in healthy if self.expected_latency(n, answer_tokens) <= fastest * (1 + LATENCY_SLACK)]
+                primary = min(within, key=lambda n: estimate_cost(n, 0, answer_tokens, self.backends))
+            else:
+                primary = min(healthy, key=lambda n: self.expected_latency(n, answer_tokens))
+
+            order = [primary]
+            for name in self.fallbacks.get(primary, ()):
+                if name in eligible and name not in order and not self.is_degraded(name):
+                    order.append(name)
+            return order
+
+    def record(self, name, ttft=None, error=False):
+        """Feed back the outcome of one turn on a backend."""
+        with self._lock:
+            stats = self._stats[name]
+            now = self.clock()
+            probe = stats.unhealthy() and now - stats.last_seen >= DEGRADED_COOLDOWN
+            if probe and not error and (ttft is None or ttft <= MAX_TTFT):
+                stats.reset()
+            stats.errors.append(error)
+            if not error and ttft is not None:
+                stats.ttfts.append(ttft)
+            stats.last_seen = now
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                name: {
+                    "median_ttft": stats.median_ttft(),
+                    "error_rate": stats.error_rate(),
+                    "degraded": self.is_degraded(name),
+                }
+                for name, stats in self._stats.items()
+            }
+
+_router = None
+_router_lock = threading.Lock()
+
+def get_model_router():
+    """Process-wide router so statistics are shared across Streamlit sessions and reruns."""
+    global _router
+    with _router_lock:
+        if _router is None:
+            _router = ModelRouter()
+        return _router
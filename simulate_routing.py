@@ -0,0 +1,157 @@
+#simulate_routing.py
+"""
+Replay a synthetic workload against local fake backends under each routing
+policy and report latency, cost and fallback behaviour. Runs on a virtual
+clock, so thousands of turns take well under a second and no API key is needed.
+
+By default native_audio degrades (4x TTFT, 50% errors) for the middle third
+of the run to show how each policy reacts.
+
+    python simulate_routing.py --turns 2000 --policies native latency cost balanced
+"""
+import argparse
+import math
+import random
+import statistics
+from collections import Counter
+from dataclasses import dataclass
+
+from model_router import POLICIES, ModelRouter, estimate_answer_tokens, estimate_cost
+from video_pipeline import TOKENS_PER_FRAME
+
+FAILED_ATTEMPT_LATENCY = 2.0  # seconds lost on a failed connect/turn before falling back
+
+SHORT_QUESTIONS = (
+    "What are your hours?",
+    "Do you serve my area?",
+    "How much is a lawn mowing visit?",
+    "Can I book for Saturday?",
+)
+LONG_QUESTIONS = (
+    "Can you explain the difference between your monthly and seasonal plans?",
+    "Tell me about all the services you offer for a new garden.",
+    "Walk me through how booking and payment work.",
+)
+
+@dataclass
+class FakeBackend:
+    ttft_median: float
+    ttft_sigma: float
+    tokens_per_s: float
+    error_rate: float
+
+FAKE_BACKENDS = {
+    "native_audio": FakeBackend(ttft_median=0.8, ttft_sigma=0.35, tokens_per_s=60, error_rate=0.02),
+    "half_cascade": FakeBackend(ttft_median=1.0, ttft_sigma=0.30, tokens_per_s=80, error_rate=0.02),
+    "live_text": FakeBackend(ttft_median=0.45, ttft_sigma=0.30, tokens_per_s=150, error_rate=0.01),
+}
+
+class VirtualClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+def make_workload(turns, seed):
+    rng = random.Random(seed)
+    workload = []
+    for _ in range(turns):
+        input_type = rng.choices(("text", "audio", "video"), weights=(0.5, 0.4, 0.1))[0]
+        long_answer = rng.random() < 0.3
+        text = rng.choice(LONG_QUESTIONS if long_answer else SHORT_QUESTIONS)
+        answer_tokens = rng.randint(200, 500) if long_answer else rng.randint(40, 120)
+        if input_type == "text":
+            input_tokens = len(text) // 4
+        else:
+            input_tokens = int(rng.uniform(3, 10) * 25)
+            if input_type == "video":
+                input_tokens += rng.randint(1, 5) * TOKENS_PER_FRAME
+        workload.append({
+            "gap": rng.expovariate(1 / 3.0),
+            "input_type": input_type,
+            "text": text if input_type == "text" else None,
+            "input_tokens": input_tokens,
+            "answer_tokens": answer_tokens,
+        })
+    return workload
+
+def percentile(samples, pct):
+    if len(samples) < 2:
+        return samples[0] if samples else 0.0
+    return statistics.quantiles(samples, n=100, method="inclusive")[pct - 1]
+
+def parse_degrade(spec):
+    name, start, end = spec.split(":")
+    if name not in FAKE_BACKENDS:
+        raise argparse.ArgumentTypeError(f"unknown backend '{name}'")
+    return name, float(start), float(end)
+
+def simulate(policy, workload, args):
+    clock = VirtualClock()
+    router = ModelRouter(policy=policy, clock=clock)
+    ttfts, totals, picks = [], [], Counter()
+    cost, failures, fallback_turns = 0.0, 0, 0
+
+    for i, turn in enumerate(workload):
+        clock.now += turn["gap"]
+        progress = i / len(workload)
+        rng = random.Random(args.seed * 1_000_003 + i)
+        expected_tokens = estimate_answer_tokens(turn["input_type"], turn["text"])
+        order = router.route(turn["input_type"], expected_tokens, audio_output=not args.allow_text)
+
+        wasted = 0.0
+        for attempt, name in enumerate(order):
+            fake = FAKE_BACKENDS[name]
+            ttft_scale, error_rate = 1.0, fake.error_rate
+            for degraded, start, end in args.degrade:
+                if degraded == name and start <= progress < end:
+                    ttft_scale, error_rate = 4.0, 0.5
+
+            if rng.random() < error_rate:
+                router.record(name, error=True)
+                wasted += FAILED_ATTEMPT_LATENCY
+                clock.now += FAILED_ATTEMPT_LATENCY
+                continue
+
+            ttft = rng.lognormvariate(math.log(fake.ttft_median * ttft_scale), fake.ttft_sigma)
+            router.record(name, ttft=ttft)
+            ttfts.append(wasted + ttft)
+            totals.append(wasted + ttft + turn["answer_tokens"] / fake.tokens_per_s)
+            cost += estimate_cost(name, turn["input_tokens"], turn["answer_tokens"])
+            picks[name] += 1
+            fallback_turns += attempt > 0
+            break
+        else:
+            failures += 1
+
+    return {
+        "ok_pct": 100 * (len(workload) - failures) / len(workload),
+        "fallback_turns": fallback_turns,
+        "ttft_p50": statistics.median(ttfts) if ttfts else 0.0,
+        "ttft_p95": percentile(ttfts, 95),
+        "total_mean": statistics.fmean(totals) if totals else 0.0,
+        "cost": cost,
+        "picks": picks,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=2000)
+    parser.add_argument("--policies", nargs="+", choices=POLICIES, default=list(POLICIES))
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--degrade", type=parse_degrade, nargs="*", default=[("native_audio", 0.33, 0.66)],
+                        metavar="BACKEND:START:END", help="degrade a backend for a fraction of the run (0-1)")
+    parser.add_argument("--allow-text", action="store_true", help="allow text-only replies (live_text backend)")
+    args = parser.parse_args()
+
+    workload = make_workload(args.turns, args.seed)
+    print(f"{'policy':<9} {'ok %':>6} {'fallbk':>6} {'TTFT p50':>9} {'TTFT p95':>9} {'total':>7} {'cost $':>9}  backends")
+    for policy in args.policies:
+        r = simulate(policy, workload, args)
+        share = ", ".join(f"{name} {100 * n / sum(r['picks'].values()):.0f}%" for name, n in r["picks"].most_common())
+        print(f"{policy:<9} {r['ok_pct']:>6.1f} {r['fallback_turns']:>6} {r['ttft_p50']:>8.2f}s {r['ttft_p95']:>8.2f}s "
+              f"{r['total_mean']:>6.2f}s {r['cost']:>9.4f}  {share}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+#video_pipeline.py
+import asyncio
+import io
+import threading
+import time
+from collections import deque
+
+import numpy as np
+from PIL import Image
+
+from audio_executor import CHANNELS, SAMPLE_WIDTH
+
+# Video Config
+VIDEO_MAX_FPS = 1.0               # Live API samples video at ~1 fps anyway
+VIDEO_MAX_KBPS = 800              # JPEG bytes per second of capture timeline
+VIDEO_MAX_SIDE = 640              # longest side after downscaling, in pixels
+VIDEO_JPEG_QUALITY = 70
+VIDEO_DUPLICATE_THRESHOLD = 0.03  # mean abs difference (0-1) below which a frame is a near-duplicate
+VIDEO_MAX_BUFFERED_FRAMES = 10    # sampled frames kept for the next turn
+TOKENS_PER_FRAME = 258
+
+IMAGE_MIME_TYPE = "image/jpeg"
+
+# --- WORKER FUNCTIONS ---
+# Run through AudioExecutor so JPEG encoding stays off the event loop.
+def encode_jpeg(rgb_buffer, shape, quality=VIDEO_JPEG_QUALITY):
+    rgb = np.frombuffer(rgb_buffer, dtype=np.uint8).reshape(shape)
+    out = io.BytesIO()
+    Image.fromarray(rgb, "RGB").save(out, format="JPEG", quality=quality)
+    return out.getvalue()
+
+def reencode_jpeg(image_data, max_side=VIDEO_MAX_SIDE, quality=VIDEO_JPEG_QUALITY):
+    """Downscale an uploaded photo (any PIL-readable format) and re-encode it as JPEG."""
+    with Image.open(io.BytesIO(image_data)) as img:
+        img = img.convert("RGB")
+        img.thumbnail((max_side, max_side))
+        out = io.BytesIO()
+        img.save(out, format="JPEG", quality=quality)
+    return out.getvalue()
+
+# --- SAMPLING ---
+def frame_signature(rgb):
+    """Coarse grayscale thumbnail (~32px on the short side) used for the duplicate check."""
+    step = max(1, min(rgb.shape[:2]) // 32)
+    return rgb[::step, ::step].mean(axis=2, dtype=np.float32) / 255.0
+
+def frame_difference(sig_a, sig_b):
+    if sig_a.shape != sig_b.shape:
+        return 1.0
+    return float(np.abs(sig_a - sig_b).mean())
+
+def downscale_frame(frame, max_side=VIDEO_MAX_SIDE):
+    """Convert an av.VideoFrame to an RGB ndarray no larger than max_side."""
+    scale = max_side / max(frame.width, frame.height)
+    if scale < 1:
+        width = max(2, int(frame.width * scale) // 2 * 2)
+        height = max(2, int(frame.height * scale) // 2 * 2)
+        frame = frame.reformat(width=width, height=height, format="rgb24")
+    return frame.to_ndarray(format="rgb24")
+
+def new_video_stats():
+    return {
+        "frames_seen": 0,
+        "frames_skipped_rate": 0,
+        "frames_skipped_duplicate": 0,
+        "frames_skipped_bitrate": 0,
+        "frames_sent": 0,
+        "bytes_sent": 0,
+    }
+
+class FrameCapture:
+    """
+    video_frame_callback for streamlit-webrtc.
+
+    Runs on the WebRTC worker thread: drops frames above VIDEO_MAX_FPS and
+    frames that barely differ from the last sampled one, downscales the rest
+    and keeps the most recent VIDEO_MAX_BUFFERED_FRAMES for the next turn.
+    The fps gate advances on every sampled frame, duplicate or not, so a
+    static scene costs at most one conversion per interval.
+    """
+
+    def __init__(self, max_fps=VIDEO_MAX_FPS, duplicate_threshold=VIDEO_DUPLICATE_THRESHOLD,
+                 max_side=VIDEO_MAX_SIDE, max_frames=VIDEO_MAX_BUFFERED_FRAMES):
+        self.min_interval = 1.0 / max_fps
+        self.duplicate_threshold = duplicate_threshold
+        self.max_side = max_side
+        self._lock = threading.Lock()
+        self._frames = deque(maxlen=max_frames)
+        self._last_time = None
+        self._last_signature = None
+        self._stats = new_video_stats()
+
+    def __call__(self, frame):
+        self.offer(lambda: downscale_frame(frame, self.max_side))
+        return frame
+
+    def offer(self, load_rgb, timestamp=None):
+        """
+        Offer one frame; returns True if it was kept. load_rgb is only called
+        for frames that pass the fps check, so dropped frames are never converted.
+        """
+        now = time.monotonic() if timestamp is None else timestamp
+        with self._lock:
+            self._stats["frames_seen"] += 1
+            if self._last_time is not None and now - self._last_time < self.min_interval:
+                self._stats["frames_skipped_rate"] += 1
+                return False
+            self._last_time = now
+
+        rgb = np.ascontiguousarray(load_rgb())
+        signature = frame_signature(rgb)
+
+        with self._lock:
+            if (self._last_signature is not None
+                    and frame_difference(signature, self._last_signature) < self.duplicate_threshold):
+                self._stats["frames_skipped_duplicate"] += 1
+                return False
+            self._last_signature = signature
+            self._frames.append((now, rgb))
+            return True
+
+    def drain(self):
+        """
+        Hand the buffered frames and capture counters to a turn and reset them.
+        The fps and duplicate baselines are reset too: each turn opens a new
+        Live session, so the next turn must get a frame of an unchanged scene.
+        """
+        with self._lock:
+            frames = list(self._frames)
+            stats = self._stats
+            self._frames.clear()
+            self._stats = new_video_stats()
+            self._last_time = None
+            self._last_signature = None
+        return frames, stats
+
+# --- TURN PREPARATION ---
+def cap_bitrate(jpeg_frames, stats, max_kbps=VIDEO_MAX_KBPS):
+    """
+    Token bucket over the capture timeline: frames that would exceed
+    max_kbps are dropped. The first frame of a turn is always kept.
+    """
+    rate = max_kbps * 1000 / 8
+    tokens = rate
+    last_ts = None
+    kept = []
+    for ts, jpeg in jpeg_frames:
+        if last_ts is not None:
+            tokens = min(rate, tokens + (ts - last_ts) * rate)
+        last_ts = ts
+        if kept and len(jpeg) > tokens:
+            stats["frames_skipped_bitrate"] += 1
+            continue
+        tokens -= len(jpeg)
+        kept.append((ts, jpeg))
+    return kept
+
+async def prepare_video_turn(executor, frames, stats=None, photo=None, quality=VIDEO_JPEG_QUALITY):
+    """
+    JPEG-encode an optional uploaded photo and the captured frames on the
+    executor, apply the bitrate cap and return (jpeg_frames, stats) with
+    timestamps relative to the first frame.
+    """
+    stats = dict(stats or new_video_stats())
+    jobs = [executor.run_on_buffer(encode_jpeg, rgb.ravel(), rgb.shape, quality) for _, rgb in frames]
+    t0 = frames[0][0] if frames else 0.0
+    timestamps = [ts - t0 for ts, _ in frames]
+    if photo:
+        # The photo goes first so the bitrate cap never drops it
+        jobs.insert(0, executor.run_on_buffer(reencode_jpeg, photo, VIDEO_MAX_SIDE, quality))
+        timestamps.insert(0, 0.0)
+        stats["frames_seen"] += 1
+    encoded = await asyncio.gather(*jobs)
+
+    jpeg_frames = cap_bitrate(list(zip(timestamps, encoded)), stats)
+    stats["frames_sent"] = len(jpeg_frames)
+    stats["bytes_sent"] = sum(len(jpeg) for _, jpeg in jpeg_frames)
+    return jpeg_frames, stats
+
+def interleave_turn(jpeg_frames, audio_chunks=(), sample_rate=None, text=None):
+    """
+    Yield (input, end_of_turn) pairs for session.send: frames are slotted in
+    between audio chunks by timestamp, any frames left over go out before the
+    last chunk, and the turn ends on the last audio chunk, the text, or the
+    last frame, whichever comes last.
+    """
+    pending = deque(jpeg_frames)
+    if sample_rate:
+        mime_type = f"audio/pcm;rate={sample_rate}"
+        bytes_per_second = sample_rate * SAMPLE_WIDTH * CHANNELS
+    position = 0.0
+    sent_audio = False
+
+    for chunk, is_last in audio_chunks:
+        while pending and (is_last or pending[0][0] <= position):
+            yield {"data": pending.popleft()[1], "mime_type": IMAGE_MIME_TYPE}, False
+        yield {"data": chunk, "mime_type": mime_type}, is_last and text is None
+        position += len(chunk) / bytes_per_second
+        sent_audio = True
+
+    while pending:
+        _, jpeg = pending.popleft()
+        yield {"data": jpeg, "mime_type": IMAGE_MIME_TYPE}, not pending and text is None and not sent_audio
+    if text is not None:
+        yield text, True